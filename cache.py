@@ -0,0 +1,48 @@
+import hashlib
+import sqlite3
+import time
+from contextlib import closing
+
+# ------------------------------------------------------
+# 💾 Persistent Response Cache (SQLite)
+# ------------------------------------------------------
+CACHE_DB = "factcheck_cache.sqlite3"
+CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+
+def _connect():
+    conn = sqlite3.connect(CACHE_DB, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB, ts INTEGER)")
+    return conn
+
+
+def make_key(endpoint: str, query: str) -> str:
+    """Hash an endpoint/query pair into a stable cache key."""
+    return hashlib.blake2b(f"{endpoint}|{query}".encode()).hexdigest()
+
+
+def get(key: str):
+    """Return the cached response body, or None if missing, expired or unreadable."""
+    try:
+        with closing(_connect()) as conn, conn:
+            row = conn.execute("SELECT body, ts FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time() - CACHE_MAX_AGE:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            return row[0]
+    except sqlite3.Error:
+        return None
+
+
+def put(key: str, body: bytes):
+    """Store a response body under the given key; failures are ignored."""
+    try:
+        with closing(_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, ts) VALUES (?, ?, ?)",
+                (key, body, int(time.time())),
+            )
+    except sqlite3.Error:
+        pass
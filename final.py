@@ -1,15 +1,22 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import orjson
 import requests
-from bs4 import BeautifulSoup
+import ahocorasick
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
 import re
-import io
 import os
-import csv
 import time
-from urllib.parse import urljoin
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import plotly.express as px
 from dotenv import load_dotenv
+import cache
 
 # ------------------------------------------------------
 # 🌐 Setup and Environment
@@ -19,136 +26,293 @@ FACT_API_KEY = os.getenv("GOOGLE_FACT_CHECK_API")
 FACT_API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
 CACHE_TTL = 24 * 60 * 60
 DATA_FILE = "politifact_claims.csv"
+POLITIFACT_URL = "https://www.politifact.com/factchecks/list/"
+MAX_PAGES = 40
+MAX_PAGE_PROBES = 8
+SCRAPE_WORKERS = 8
+MAX_WORKERS = 16
+API_RATE_LIMIT = 300  # requests per minute
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,  # per-host pools kept; only the API and PolitiFact hosts are used
+    pool_maxsize=MAX_WORKERS,  # keep-alive connections per host: one per verification worker
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
 
 # ------------------------------------------------------
 # 🧹 Utility: Text Cleaning
 # ------------------------------------------------------
-def clean_text(text: str) -> str:
-    """Standardize input text before API queries."""
-    if not isinstance(text, str):
-        return ""
-    text = re.sub(r'[“”"\'.,!?]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text[:250]
+_PUNCT_RE = re.compile(r'[“”"\'.,!?]')
+_SPACE_RE = re.compile(r'\s+')
+
+def prepare_queries(df: pd.DataFrame) -> pd.Series:
+    """Standardize the statement column into API query strings."""
+    return (
+        df["statement"]
+        .str.replace(_PUNCT_RE, "", regex=True)
+        .str.replace(_SPACE_RE, " ", regex=True)
+        .str.strip()
+        .str.slice(0, 250)
+        .fillna("")
+    )
 
 # ------------------------------------------------------
 # 🔍 Google Fact Check Integration
 # ------------------------------------------------------
-@st.cache_data(ttl=CACHE_TTL)
-def get_fact_check_result(statement: str):
-    """Fetch fact-check results from Google's API."""
+_RATE_WINDOW = deque()
+_RATE_LOCK = threading.Lock()
+_VERDICT_KEYWORDS = {
+    "false": "False", "misleading": "False", "pants": "False",
+    "true": "True", "accurate": "True", "correct": "True", "mostly true": "True",
+}
+_VERDICT_AUTOMATON = ahocorasick.Automaton()
+for _keyword, _verdict in _VERDICT_KEYWORDS.items():
+    _VERDICT_AUTOMATON.add_word(_keyword, _verdict)
+_VERDICT_AUTOMATON.make_automaton()
+
+def _throttle():
+    """Block until another API call fits in the per-minute quota."""
+    while True:
+        with _RATE_LOCK:
+            now = time.monotonic()
+            while _RATE_WINDOW and now - _RATE_WINDOW[0] >= 60:
+                _RATE_WINDOW.popleft()
+            if len(_RATE_WINDOW) < API_RATE_LIMIT:
+                _RATE_WINDOW.append(now)
+                return
+            wait = 60 - (now - _RATE_WINDOW[0])
+        time.sleep(wait)
+
+def _decode(body: bytes) -> dict:
+    """Parse a claims:search response body, raising ValueError if it is not a JSON object."""
+    data = orjson.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError("Unexpected Fact Check API response")
+    return data
+
+def _fetch_raw(query: str) -> bytes:
+    """Query Google's Fact Check API and return the raw response body."""
+    key = cache.make_key(FACT_API_URL, query)
+    body = cache.get(key)
+    if body is not None:
+        try:
+            _decode(body)
+            return body
+        except ValueError:
+            pass
+
+    _throttle()
+    params = {"query": query, "key": FACT_API_KEY}
+    res = _SESSION.get(FACT_API_URL, params=params, timeout=10)
+    res.raise_for_status()
+    body = res.content
+    _decode(body)
+    cache.put(key, body)
+    return body
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _cached_fetch(query: str) -> bytes:
+    """In-process cache of raw responses; parsing happens outside the cache."""
+    return _fetch_raw(query)
+
+def _match_verdict(rating_text: str):
+    """Scan a rating once for verdict keywords; False keywords take precedence."""
+    found = None
+    for _, verdict in _VERDICT_AUTOMATON.iter(rating_text.lower()):
+        if verdict == "False":
+            return verdict
+        found = verdict
+    return found
+
+def parse_verdict(claims):
+    """Map the first decisive claim review to a True/False verdict."""
+    for claim in claims:
+        for review in claim.get("claimReview", []):
+            rating_text = review.get("textualRating", "")
+            publisher = review.get("publisher", {}).get("name", "Unknown")
+            url = review.get("url", "")
+
+            verdict = _match_verdict(rating_text)
+            if verdict:
+                return {"verdict": verdict, "publisher": publisher, "rating": rating_text, "url": url}
+    return {"verdict": "Unverified", "publisher": None, "rating": None, "url": None}
+
+def get_fact_check_result(query: str):
+    """Fetch fact-check results from Google's API for a cleaned query."""
     if not FACT_API_KEY:
         return {"verdict": "API Key Missing", "publisher": None, "rating": None, "url": None}
 
-    query = clean_text(statement)
     if not query:
         return {"verdict": "Unverified", "publisher": None, "rating": None, "url": None}
 
-    params = {"query": query, "key": FACT_API_KEY}
     try:
-        res = requests.get(FACT_API_URL, params=params, timeout=10)
-        res.raise_for_status()
-        data = res.json().get("claims", [])
-
-        for claim in data:
-            for review in claim.get("claimReview", []):
-                rating_text = review.get("textualRating", "").lower()
-                publisher = review.get("publisher", {}).get("name", "Unknown")
-                url = review.get("url", "")
-
-                if any(k in rating_text for k in ["false", "misleading", "pants"]):
-                    return {"verdict": "False", "publisher": publisher, "rating": rating_text, "url": url}
-                if any(k in rating_text for k in ["true", "accurate", "correct", "mostly true"]):
-                    return {"verdict": "True", "publisher": publisher, "rating": rating_text, "url": url}
-        return {"verdict": "Unverified", "publisher": None, "rating": None, "url": None}
-
-    except requests.RequestException as e:
+        return parse_verdict(_decode(_cached_fetch(query)).get("claims", []))
+    except (requests.RequestException, ValueError) as e:
         return {"verdict": "API Error", "publisher": None, "rating": str(e), "url": None}
 
 # ------------------------------------------------------
 # 📰 PolitiFact Scraper
 # ------------------------------------------------------
+_STATED_ON_RE = re.compile(r"stated on ([A-Za-z]+\s+\d{1,2},\s+\d{4})")
+
+def _fetch_page(page: int) -> bytes:
+    """Download one page of the PolitiFact fact-check listing."""
+    response = _SESSION.get(POLITIFACT_URL, params={"page": page}, timeout=10)
+    response.raise_for_status()
+    return response.content
+
+def _parse_page(body: bytes):
+    """Return a page's claim cards, the dated subset, and their parsed 'stated on' dates."""
+    cards = LexborHTMLParser(body).css("li.o-listicle__item")
+    dated_cards, date_strs = [], []
+    for card in cards:
+        date_block = card.css_first("div.m-statement__desc")
+        match = _STATED_ON_RE.search(date_block.text()) if date_block else None
+        if match:
+            dated_cards.append(card)
+            date_strs.append(match.group(1))
+    return cards, dated_cards, pd.to_datetime(date_strs, format="%B %d, %Y", errors="coerce")
+
+def _find_first_page(end_date, probed: dict) -> int:
+    """Estimate the first listing page that reaches back to end_date.
+
+    Pages entirely newer than end_date are skipped by extrapolating from the
+    date span of the last probed page; an overshoot bisects back toward the
+    last page known to be too new. A page is only accepted once its newest
+    claim is after end_date, or the page before it is known to be too new.
+    Probed bodies are stored in ``probed`` so the walk can reuse them.
+
+    The listing is ordered by publication, not by 'stated on' date, so a
+    skipped page judged too new from its neighbours can still hold an
+    out-of-order in-range claim; the skip trades that rare miss for far
+    fewer requests on historical windows.
+    """
+    low, high, page = 1, None, 1
+    for _ in range(MAX_PAGE_PROBES):
+        if page not in probed:
+            try:
+                probed[page] = _fetch_page(page)
+            except requests.RequestException:
+                return low
+        page_dates = _parse_page(probed[page])[2].dropna()
+        if page_dates.empty:
+            return low
+
+        newest, oldest = page_dates.max(), page_dates.min()
+        if oldest > end_date:
+            low = page + 1
+            span_days = max((newest - oldest).days, 1)
+            page += max(1, (oldest - end_date).days // span_days)
+        elif newest > end_date or page == low:
+            return page
+        else:
+            high = page
+
+        if high is not None:
+            if low >= high:
+                return low
+            if page >= high:
+                page = (low + high) // 2
+    return low
+
+@st.cache_data(ttl=3600, show_spinner="📄 Scraping PolitiFact…")
 def scrape_politifact(start_date, end_date):
     """Scrape PolitiFact fact-checks for the given date range."""
-    base_url = "https://www.politifact.com/factchecks/list/"
-    next_page = base_url
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(["author", "statement", "source", "date", "label"])
-
-    session = requests.Session()
-    page_count, total_rows = 0, 0
-    status = st.empty()
-
-    while next_page and page_count < 40:
-        page_count += 1
-        status.info(f"📄 Fetching page {page_count}... ({total_rows} rows collected)")
+    authors, statements, sources, dates, labels = [], [], [], [], []
+    probed = {}
+    first_page = _find_first_page(end_date, probed)
+
+    # At most SCRAPE_WORKERS pages are fetched ahead of the one being parsed;
+    # the pool size doubles as the per-host concurrency limit.
+    pages = iter(range(first_page, first_page + MAX_PAGES))
+    with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+        def submit(page):
+            if page in probed:
+                future = Future()
+                future.set_result(probed[page])
+                return future
+            return executor.submit(_fetch_page, page)
+
+        pending = deque(submit(page) for page in islice(pages, SCRAPE_WORKERS))
         try:
-            response = session.get(next_page, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "lxml")
-        except Exception as e:
-            st.error(f"⚠️ Error fetching data: {e}")
-            break
+            while pending:
+                future = pending.popleft()
+                page = next(pages, None)
+                if page is not None:
+                    pending.append(submit(page))
 
-        for card in soup.select("li.o-listicle__item"):
-            date_block = card.select_one("div.m-statement__desc")
-            if not date_block:
-                continue
+                cards, dated_cards, page_dates = _parse_page(future.result())
 
-            match = re.search(r"stated on ([A-Za-z]+\s+\d{1,2},\s+\d{4})", date_block.text)
-            if not match:
-                continue
+                if not cards:
+                    break
 
-            try:
-                claim_date = pd.to_datetime(match.group(1))
-            except ValueError:
-                continue
-
-            if claim_date < start_date:
-                next_page = None
-                break
-            if not (start_date <= claim_date <= end_date):
-                continue
-
-            statement_tag = card.select_one("div.m-statement__quote a")
-            statement = statement_tag.get_text(strip=True) if statement_tag else None
-            source_tag = card.select_one("a.m-statement__name")
-            source = source_tag.get_text(strip=True) if source_tag else None
-            footer_tag = card.select_one("footer.m-statement__footer")
-            author = re.search(r"By\s+([^•]+)", footer_tag.text).group(1).strip() if footer_tag else None
-            label_img = card.find("img", alt=True)
-            label = label_img["alt"].replace("-", " ").title() if label_img else None
-
-            if statement:
-                writer.writerow([author, statement, source, claim_date.strftime("%Y-%m-%d"), label])
-                total_rows += 1
-
-        next_btn = soup.find("a", class_="c-button c-button--hollow", string=re.compile("Next", re.I))
-        next_page = urljoin(base_url, next_btn["href"]) if next_btn else None
-        time.sleep(1)
-
-    buffer.seek(0)
-    df = pd.read_csv(buffer).dropna(subset=["statement"])
-    df.to_csv(DATA_FILE, index=False)
-    return df
+                in_range = (page_dates >= start_date) & (page_dates <= end_date)
+                for card, claim_date, keep in zip(dated_cards, page_dates, in_range):
+                    if not keep:
+                        continue
+
+                    statement_tag = card.css_first("div.m-statement__quote a")
+                    statement = statement_tag.text(strip=True) if statement_tag else None
+                    source_tag = card.css_first("a.m-statement__name")
+                    source = source_tag.text(strip=True) if source_tag else None
+                    footer_tag = card.css_first("footer.m-statement__footer")
+                    author = re.search(r"By\s+([^•]+)", footer_tag.text()).group(1).strip() if footer_tag else None
+                    label_img = card.css_first("img[alt]")
+                    label = label_img.attributes["alt"].replace("-", " ").title() if label_img else None
+
+                    if statement:
+                        authors.append(author)
+                        statements.append(statement)
+                        sources.append(source)
+                        dates.append(claim_date.strftime("%Y-%m-%d"))
+                        labels.append(label)
+
+                if page_dates.max() < start_date:
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+
+    return pd.DataFrame({
+        "author": authors,
+        "statement": statements,
+        "source": sources,
+        "date": dates,
+        "label": labels,
+    })
 
 # ------------------------------------------------------
 # 🤖 Batch Verification
 # ------------------------------------------------------
 def verify_all(df: pd.DataFrame):
     st.info("🔎 Running Google Fact Check verification...")
-    results, progress = [], st.progress(0)
+    progress = st.progress(0)
+    queries = prepare_queries(df)
+    unique_queries = queries.drop_duplicates().tolist()
+    n = len(unique_queries)
+    step = max(1, n // 100)
+    verdicts = np.empty(n, dtype=object)
+    publishers = np.empty(n, dtype=object)
+    ratings = np.empty(n, dtype=object)
+    urls = np.empty(n, dtype=object)
 
-    for i, row in enumerate(df.itertuples(index=False)):
-        res = get_fact_check_result(row.statement)
-        results.append(res)
-        progress.progress((i + 1) / len(df))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(get_fact_check_result, q): i for i, q in enumerate(unique_queries)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i, res = futures[future], future.result()
+            verdicts[i] = res["verdict"]
+            publishers[i] = res["publisher"]
+            ratings[i] = res["rating"]
+            urls[i] = res["url"]
+            if done % step == 0 or done == n:
+                progress.progress(done / n)
 
-    df["google_verdict"] = [r["verdict"] for r in results]
-    df["publisher"] = [r["publisher"] for r in results]
-    df["google_rating"] = [r["rating"] for r in results]
-    df["fact_url"] = [r["url"] for r in results]
+    rows = pd.Index(unique_queries).get_indexer(queries)
+    df["google_verdict"] = verdicts[rows]
+    df["publisher"] = publishers[rows]
+    df["google_rating"] = ratings[rows]
+    df["fact_url"] = urls[rows]
     return df
 
 # ------------------------------------------------------
@@ -168,6 +332,14 @@ def show_results(df):
     )
     st.plotly_chart(fig, use_container_width=True)
 
+# ------------------------------------------------------
+# 📤 Export
+# ------------------------------------------------------
+@st.cache_data(ttl=CACHE_TTL, max_entries=8, show_spinner=False)
+def _to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame to CSV once per distinct frame."""
+    return df.to_csv(index=False).encode()
+
 # ------------------------------------------------------
 # 🎨 Custom Styling
 # ------------------------------------------------------
@@ -225,22 +397,31 @@ def main():
     if "data" not in st.session_state:
         st.session_state.data = pd.DataFrame()
 
+    df = None
     if st.button("🔍 Fetch PolitiFact Claims"):
-        df = scrape_politifact(pd.to_datetime(start_date), pd.to_datetime(end_date))
+        try:
+            df = scrape_politifact(pd.to_datetime(start_date), pd.to_datetime(end_date))
+        except requests.RequestException as e:
+            st.error(f"⚠️ Error fetching data: {e}")
+
+    if df is not None:
+        csv_data = _to_csv_bytes(df)
+        with open(DATA_FILE, "wb") as f:
+            f.write(csv_data)
         if df.empty:
             st.warning("No claims found for the selected period.")
         else:
             st.session_state.data = df
             st.success(f"✅ Scraped {len(df)} records successfully!")
             st.dataframe(df, use_container_width=True)
-            st.download_button("📥 Download Scraped Data", df.to_csv(index=False), "claims.csv")
+            st.download_button("📥 Download Scraped Data", csv_data, "claims.csv", "text/csv")
 
     if not st.session_state.data.empty:
         if st.button("🚀 Verify with Google Fact Check"):
             verified_df = verify_all(st.session_state.data)
             show_results(verified_df)
             st.dataframe(verified_df, use_container_width=True)
-            st.download_button("📥 Download Verified Results", verified_df.to_csv(index=False), "verified_claims.csv")
+            st.download_button("📥 Download Verified Results", _to_csv_bytes(verified_df), "verified_claims.csv", "text/csv")
 
 if __name__ == "__main__":
     main()